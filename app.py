@@ -1,17 +1,47 @@
 # Import necessary libraries
 import os
+import re
 import sqlite3
+import threading
 import time
-from flask import Flask, request, jsonify
-from twilio.rest import Client
-import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import quote
+import orjson
+import urllib3
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file
 load_dotenv()
 
+
+# Flask's JSON provider, swapped to orjson, which is much faster than the standard json module
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes with orjson.
+    Keys are sorted and debug responses indented as with Flask's default provider;
+    unlike it, non-ASCII characters are written as UTF-8 rather than escaped.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = 0
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # Initialize the Flask application
 app = Flask(__name__)
+# Serialize all jsonify() responses with orjson
+app.json = OrjsonProvider(app)
 
 # Get Twilio and Solidarity Tech API credentials from environment variables
 # Your Account SID and Auth Token from twilio.com/console
@@ -26,23 +56,191 @@ if not account_sid or not auth_token:
     # For demonstration purposes, we'll allow the app to run without them,
     # but the lookup functionality will fail.
 
-# Initialize the Twilio client
-client = Client(account_sid, auth_token)
+# Maximum number of Twilio lookups run in parallel by /verify_all_identities, per
+# worker process (gunicorn with N workers allows N times this many in total).
+# Keeping this bounded avoids hitting Twilio's rate limit (HTTP 429) on large user lists.
+# The executor is shared by all requests in the process and runs lookups in FIFO
+# order, so lookups from other requests wait behind a large request's queued ones.
+TWILIO_CONCURRENCY = int(os.environ.get("TWILIO_CONCURRENCY", 8))
+lookup_executor = ThreadPoolExecutor(max_workers=TWILIO_CONCURRENCY)
+
+# Persistent HTTPS connection pool for the Twilio Lookup API, so repeated lookups
+# reuse already-established TCP/TLS connections instead of opening new ones.
+# Failed and rate-limited (429) requests are retried up to 4 times (5 attempts in
+# all) with jittered exponential backoff capped at 10s. Twilio's Retry-After header
+# is ignored so that a long value can't tie up a lookup thread for that long.
+twilio_pool = urllib3.HTTPSConnectionPool(
+    "lookups.twilio.com",
+    maxsize=max(20, TWILIO_CONCURRENCY),
+    block=False,
+    retries=urllib3.Retry(
+        total=4,
+        backoff_factor=1,
+        backoff_max=10,
+        backoff_jitter=1,
+        status_forcelist=(429,),
+        respect_retry_after_header=False,
+    ),
+    timeout=urllib3.Timeout(connect=2, read=5),
+)
+twilio_auth_headers = urllib3.make_headers(basic_auth=f"{account_sid}:{auth_token}")
 
-# Global variable to store the last looked-up caller name
-stored_caller_name = None
 
-# Set up SQLite cache to store recent lookups
-DB_PATH = "lookup_cache.db"
+class TwilioLookupError(Exception):
+    """Raised when the Twilio Lookup API returns an error response."""
+
+
+# Phone numbers in E.164 format, e.g. +15551234567
+E164_PATTERN = re.compile(r"\+[1-9][0-9]{1,14}")
+
+
+def is_valid_phone_number(phone_number):
+    """Return True if the phone number is in E.164 format."""
+    return E164_PATTERN.fullmatch(phone_number) is not None
+
+
+def twilio_lookup(phone_number):
+    """Fetch the caller name information for a phone number from the Twilio Lookup v2 API."""
+    # The number comes from the request, so make sure it can't change the
+    # (authenticated) request path
+    if not is_valid_phone_number(phone_number):
+        raise TwilioLookupError(f"Invalid phone number: {phone_number!r}")
+    response = twilio_pool.request(
+        "GET",
+        f"/v2/PhoneNumbers/{quote(phone_number, safe='')}?Fields=caller_name",
+        headers=twilio_auth_headers,
+    )
+    try:
+        data = orjson.loads(response.data)
+    except orjson.JSONDecodeError:
+        data = {}
+    if response.status != 200:
+        raise TwilioLookupError(data.get("message") or f"Twilio Lookup API returned HTTP {response.status}")
+    return data
+
+# Set up the cache to store recent lookups.
 # Default cache TTL is one hour; can be overridden with CACHE_TTL_SECONDS env var
 CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", 3600))
+# If REDIS_URL is set (e.g. redis://localhost:6379/0), lookups are cached in Redis
+# so that all app instances share one cache; otherwise a local SQLite file is used.
+REDIS_URL = os.environ.get("REDIS_URL")
+# How long /get_caller_name keeps reporting the last looked-up caller name
+LAST_CALLER_TTL_SECONDS = 300
+DB_PATH = "lookup_cache.db"
 
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-cursor = conn.cursor()
-cursor.execute(
-    "CREATE TABLE IF NOT EXISTS lookup_cache (phone_number TEXT PRIMARY KEY, name TEXT, timestamp INTEGER)"
-)
-conn.commit()
+if REDIS_URL:
+    import redis
+
+    redis_pool = redis.ConnectionPool.from_url(REDIS_URL, decode_responses=True)
+    redis_client = redis.Redis(connection_pool=redis_pool)
+else:
+    redis_client = None
+
+# Each thread gets its own SQLite connection, so lookups running in parallel
+# don't have to queue up behind a single shared connection
+_db_local = threading.local()
+
+
+def get_db():
+    """Return this thread's SQLite connection, opening it on first use."""
+    conn = getattr(_db_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH)
+        # WAL lets readers proceed while a write is in progress, and with
+        # synchronous=NORMAL commits no longer wait for an fsync
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        _db_local.conn = conn
+    return conn
+
+
+def init_db():
+    """Create the SQLite cache tables, migrating a lookup_cache table from the old schema."""
+    conn = get_db()
+    # Take the write lock up front so workers starting at the same time don't
+    # race each other through the migration
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'lookup_cache'"
+        ).fetchone()
+        migrate = row is not None and "WITHOUT ROWID" not in row[0].upper()
+        if migrate:
+            conn.execute("ALTER TABLE lookup_cache RENAME TO lookup_cache_old")
+        # WITHOUT ROWID stores rows in the primary key b-tree itself, so a lookup
+        # by phone number is a single b-tree search
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS lookup_cache ("
+            "phone_number TEXT PRIMARY KEY, name TEXT NOT NULL, timestamp INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        # Lets expired entries be found without scanning the whole table
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_lookup_ts ON lookup_cache(timestamp)")
+        if migrate:
+            conn.execute(
+                "INSERT OR IGNORE INTO lookup_cache (phone_number, name, timestamp) "
+                "SELECT phone_number, name, timestamp FROM lookup_cache_old "
+                "WHERE phone_number IS NOT NULL AND name IS NOT NULL AND timestamp IS NOT NULL"
+            )
+            conn.execute("DROP TABLE lookup_cache_old")
+        # Single-row table holding the last looked-up caller name, shared by all workers
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS last_caller (id INTEGER PRIMARY KEY CHECK (id = 0), name TEXT, timestamp INTEGER)"
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def sweep_expired_entries():
+    """Delete expired lookup cache entries every SWEEP_INTERVAL_SECONDS."""
+    while True:
+        time.sleep(SWEEP_INTERVAL_SECONDS)
+        try:
+            conn = get_db()
+            with conn:
+                conn.execute(
+                    "DELETE FROM lookup_cache WHERE timestamp < ?",
+                    (int(time.time()) - CACHE_TTL_SECONDS,),
+                )
+        except sqlite3.Error as e:
+            print(f"WARNING: Could not sweep expired lookup cache entries: {e}")
+
+
+# Expired entries are deleted periodically in the background so that cache
+# reads never have to write to the database
+SWEEP_INTERVAL_SECONDS = int(os.environ.get("SWEEP_INTERVAL_SECONDS", 60))
+
+if redis_client is None:
+    init_db()
+    threading.Thread(target=sweep_expired_entries, name="cache-sweeper", daemon=True).start()
+
+# In-memory LRU cache in front of SQLite so hot numbers skip the database.
+# Maps phone number -> (name, expiry timestamp), oldest entries first.
+_L1_MAX = 10000
+_l1_cache = OrderedDict()
+_l1_lock = threading.Lock()
+
+# Per-process counters of where cached names were found, reported by /cache_stats
+cache_stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+# The static list of users served by the mock Solidarity Tech API.
+USERS = [
+    {
+        "phone_number": "+15551234567",
+        "name": "John Doe"
+    },
+    {
+        "phone_number": "+15557654321",
+        "name": "Jane Smith"
+    }
+]
+# Phone number -> name mapping, built once instead of on every request
+USERS_BY_PHONE = {user["phone_number"]: user["name"] for user in USERS}
 
 # A local mock database of phone numbers and names.
 # This is used as a fallback if the Solidarity Tech API key is not provided.
@@ -52,31 +250,138 @@ local_mock_database = {
 }
 
 
+def load_user_data():
+    """Return the phone number -> name mapping to verify callers against."""
+    # If a Solidarity Tech API key is provided, use the Solidarity Tech user data.
+    # The mock API lives in this process, so its precomputed mapping is read
+    # directly rather than making an HTTP request back to ourselves.
+    if solidarity_tech_api_key:
+        return USERS_BY_PHONE
+    # Otherwise, use the local mock database
+    return local_mock_database
+
+
+def _l1_get(phone_number):
+    """Return the name from the in-memory cache if present and fresh, else None."""
+    with _l1_lock:
+        entry = _l1_cache.get(phone_number)
+        if entry is None:
+            return None
+        name, expires_at = entry
+        if time.time() >= expires_at:
+            del _l1_cache[phone_number]
+            return None
+        _l1_cache.move_to_end(phone_number)
+        return name
+
+
+def _l1_set(phone_number, name, expires_at):
+    """Store a name in the in-memory cache, evicting the least recently used entry if full."""
+    with _l1_lock:
+        _l1_cache[phone_number] = (name, expires_at)
+        _l1_cache.move_to_end(phone_number)
+        if len(_l1_cache) > _L1_MAX:
+            _l1_cache.popitem(last=False)
+
+
+def _redis_key(phone_number):
+    return f"caller:{phone_number}"
+
+
+def _count(stat):
+    with _stats_lock:
+        cache_stats[stat] += 1
+
+
+# Maximum number of phone numbers per SQLite "IN (...)" query
+_SQLITE_BATCH_SIZE = 500
+
+
 def get_cached_name(phone_number):
     """Return cached name if entry is fresh, else None."""
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT name, timestamp FROM lookup_cache WHERE phone_number = ?",
-        (phone_number,),
-    )
-    row = cursor.fetchone()
-    if row:
-        name, ts = row
-        if time.time() - ts < CACHE_TTL_SECONDS:
-            return name
-        # Remove expired entry
-        cursor.execute("DELETE FROM lookup_cache WHERE phone_number = ?", (phone_number,))
-        conn.commit()
-    return None
+    return get_cached_names([phone_number]).get(phone_number)
+
+
+def get_cached_names(phone_numbers):
+    """Return a phone number -> name mapping for the numbers with a fresh cache entry."""
+    names = {}
+    misses = []
+    for phone_number in phone_numbers:
+        name = _l1_get(phone_number)
+        if name is not None:
+            _count("l1_hits")
+            names[phone_number] = name
+        else:
+            misses.append(phone_number)
+    if not misses:
+        return names
+
+    if redis_client is not None:
+        # Redis expires entries itself; fetch every name and its remaining TTL
+        # in a single round trip
+        pipeline = redis_client.pipeline(transaction=False)
+        for phone_number in misses:
+            key = _redis_key(phone_number)
+            pipeline.get(key).ttl(key)
+        replies = pipeline.execute()
+        for i, phone_number in enumerate(misses):
+            name, ttl = replies[2 * i], replies[2 * i + 1]
+            if name is not None and ttl > 0:
+                _l1_set(phone_number, name, time.time() + ttl)
+                names[phone_number] = name
+    else:
+        conn = get_db()
+        now = time.time()
+        for i in range(0, len(misses), _SQLITE_BATCH_SIZE):
+            batch = misses[i:i + _SQLITE_BATCH_SIZE]
+            rows = conn.execute(
+                "SELECT phone_number, name, timestamp FROM lookup_cache WHERE phone_number IN "
+                f"({', '.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for phone_number, name, ts in rows:
+                # Expired entries are left for the background sweeper to delete
+                if now - ts < CACHE_TTL_SECONDS:
+                    _l1_set(phone_number, name, ts + CACHE_TTL_SECONDS)
+                    names[phone_number] = name
+
+    for phone_number in misses:
+        _count("l2_hits" if phone_number in names else "misses")
+    return names
 
 
 def cache_name(phone_number, name):
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR REPLACE INTO lookup_cache (phone_number, name, timestamp) VALUES (?, ?, ?)",
-        (phone_number, name, int(time.time())),
-    )
-    conn.commit()
+    cache_names_bulk([(phone_number, name)])
+
+
+def cache_names_bulk(items):
+    """Cache several (phone_number, name) pairs with a single write to the backing store."""
+    if not items:
+        return
+    ts = int(time.time())
+    for phone_number, name in items:
+        _l1_set(phone_number, name, ts + CACHE_TTL_SECONDS)
+    if redis_client is not None:
+        pipeline = redis_client.pipeline()
+        for phone_number, name in items:
+            pipeline.setex(_redis_key(phone_number), CACHE_TTL_SECONDS, name)
+        pipeline.execute()
+        return
+    # executemany reuses one prepared statement, and the with block commits
+    # all rows in a single transaction
+    conn = get_db()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO lookup_cache (phone_number, name, timestamp) VALUES (?, ?, ?)",
+            [(phone_number, name, ts) for phone_number, name in items],
+        )
+
+
+def lookup_caller_name(phone_number):
+    """Fetch the caller name for a phone number from Twilio, bypassing the cache."""
+    phone_number_info = twilio_lookup(phone_number)
+    # The caller_name field is an object holding the name along with its type and error code
+    return (phone_number_info.get("caller_name") or {}).get("caller_name")
 
 
 def fetch_caller_name_with_cache(phone_number):
@@ -84,30 +389,42 @@ def fetch_caller_name_with_cache(phone_number):
     cached = get_cached_name(phone_number)
     if cached:
         return cached
-    phone_number_info = client.lookups.v2.phone_numbers(phone_number).fetch(
-        fields="caller_name"
-    )
-    caller_name = phone_number_info.caller_name
+    caller_name = lookup_caller_name(phone_number)
     if caller_name:
         cache_name(phone_number, caller_name)
     return caller_name
 
+def set_last_caller_name(name):
+    """Record the last looked-up caller name so any worker can report it."""
+    if redis_client is not None:
+        if name:
+            redis_client.setex("last_caller_name", LAST_CALLER_TTL_SECONDS, name)
+        else:
+            redis_client.delete("last_caller_name")
+        return
+    conn = get_db()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO last_caller (id, name, timestamp) VALUES (0, ?, ?)",
+            (name, int(time.time())),
+        )
+
+
+def get_last_caller_name():
+    """Return the last looked-up caller name, or None if there is none or it has expired."""
+    if redis_client is not None:
+        return redis_client.get("last_caller_name")
+    row = get_db().execute("SELECT name, timestamp FROM last_caller WHERE id = 0").fetchone()
+    if row and time.time() - row[1] < LAST_CALLER_TTL_SECONDS:
+        return row[0]
+    return None
+
 # This route simulates the Solidarity Tech API.
 # It returns a static list of users.
 @app.route("/solidarity_tech_api/users", methods=["GET"])
 def get_users():
     """Mock Solidarity Tech API endpoint to get a list of users."""
-    users = [
-        {
-            "phone_number": "+15551234567",
-            "name": "John Doe"
-        },
-        {
-            "phone_number": "+15557654321",
-            "name": "Jane Smith"
-        }
-    ]
-    return jsonify(users)
+    return jsonify(USERS)
 
 # This route looks up the caller name for a given phone number using the Twilio Lookup API.
 @app.route("/lookup", methods=["GET"])
@@ -117,35 +434,50 @@ def lookup_phone_number():
     The phone number should be passed as a query parameter.
     Example: /lookup?phone_number=+15551234567
     """
-    global stored_caller_name
     phone_number = request.args.get("phone_number")
 
     # Check if the phone_number parameter is provided
     if not phone_number:
         return jsonify({"error": "phone_number parameter is required"}), 400
+    if not is_valid_phone_number(phone_number):
+        return jsonify({"error": "phone_number must be in E.164 format, e.g. +15551234567"}), 400
 
     try:
         caller_name = fetch_caller_name_with_cache(phone_number)
-        stored_caller_name = caller_name  # Store the caller name in the global variable
-
-        # Return the caller name if found
-        if caller_name:
-            return jsonify({"phone_number": phone_number, "name": caller_name}), 200
-        else:
-            return jsonify({"phone_number": phone_number, "name": "Name not found or not available"}), 200
     except Exception as e:
         # Handle exceptions, such as an invalid phone number
         return jsonify({"error": str(e)}), 500
 
+    # Store the caller name for /get_caller_name; a failure here shouldn't fail the lookup
+    try:
+        set_last_caller_name(caller_name)
+    except Exception as e:
+        print(f"WARNING: Could not store the last caller name: {e}")
+
+    # Return the caller name if found
+    if caller_name:
+        return jsonify({"phone_number": phone_number, "name": caller_name}), 200
+    else:
+        return jsonify({"phone_number": phone_number, "name": "Name not found or not available"}), 200
+
 # This route retrieves the last looked-up caller name.
 @app.route("/get_caller_name", methods=["GET"])
 def get_caller_name():
     """Retrieves the last looked-up caller name."""
-    if stored_caller_name:
-        return jsonify({"caller_name": stored_caller_name}), 200
+    caller_name = get_last_caller_name()
+    if caller_name:
+        return jsonify({"caller_name": caller_name}), 200
     else:
         return jsonify({"message": "Caller name not found or not looked up yet."}), 404
 
+# This route reports how often lookups were answered from the cache.
+@app.route("/cache_stats", methods=["GET"])
+def get_cache_stats():
+    """Returns this worker's cache hit and miss counters."""
+    with _stats_lock:
+        stats = dict(cache_stats)
+    return jsonify(stats), 200
+
 # This route verifies the identity of a caller by comparing the name from Twilio with the name in the database.
 @app.route("/verify_identity", methods=["GET"])
 def verify_identity():
@@ -161,19 +493,7 @@ def verify_identity():
     if not phone_number:
         return jsonify({"error": "phone_number parameter is required"}), 400
 
-    user_data = {}
-    # If a Solidarity Tech API key is provided, use the API to get user data
-    if solidarity_tech_api_key:
-        try:
-            response = requests.get("http://127.0.0.1:5000/solidarity_tech_api/users")
-            response.raise_for_status()  # Raise an exception for bad status codes
-            users = response.json()
-            user_data = {user["phone_number"]: user["name"] for user in users}
-        except requests.exceptions.RequestException as e:
-            return jsonify({"error": f"Could not connect to Solidarity Tech API: {e}"}), 500
-    else:
-        # Otherwise, use the local mock database
-        user_data = local_mock_database
+    user_data = load_user_data()
 
     # Get the claimed name from the database
     claimed_name = user_data.get(phone_number)
@@ -182,9 +502,17 @@ def verify_identity():
     if not claimed_name:
         return jsonify({"error": "Phone number not found in database"}), 404
 
-    # Get the caller name using the cache-enhanced lookup
     try:
-        caller_name = fetch_caller_name_with_cache(phone_number)
+        # A cached name is compared directly, without any call to Twilio
+        caller_name = get_cached_name(phone_number)
+        if caller_name == claimed_name:
+            return jsonify({"status": "Identity Verified"}), 200
+
+        # Otherwise look the caller name up on Twilio
+        if not caller_name:
+            caller_name = lookup_caller_name(phone_number)
+            if caller_name:
+                cache_name(phone_number, caller_name)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -194,61 +522,124 @@ def verify_identity():
     else:
         return jsonify({"status": "Identity Invalid"}), 200
 
+def identity_result(phone_number, claimed_name, caller_name):
+    """Build the /verify_all_identities entry for one user."""
+    # Compare the names
+    if caller_name and caller_name == claimed_name:
+        status = "Identity Verified"
+    else:
+        status = "Identity Invalid"
+
+    return {
+        "phone_number": phone_number,
+        "claimed_name": claimed_name,
+        "twilio_name": caller_name or "Name not found or not available",
+        "status": status
+    }
+
+def lookup_error_result(phone_number, claimed_name, error):
+    """Build the /verify_all_identities entry for a user whose lookup failed."""
+    return {
+        "phone_number": phone_number,
+        "claimed_name": claimed_name,
+        "twilio_name": None,
+        "status": "Twilio Lookup Error",
+        "error": str(error)
+    }
+
+def cache_finished_lookup(phone_number, future):
+    """Cache the result of a lookup whose response was abandoned by the client."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    caller_name = future.result()
+    if caller_name:
+        try:
+            cache_name(phone_number, caller_name)
+        except Exception as e:
+            print(f"WARNING: Could not cache lookup result for {phone_number}: {e}")
+
 # This route verifies the identities of all users in the database.
 @app.route("/verify_all_identities", methods=["GET"])
 def verify_all_identities():
     """
     Verifies the identities of all users in the database by comparing the names
     from the Twilio Lookup API with the names in the database.
+    The results are streamed as a JSON array, in the order the lookups complete.
     """
-    user_data = {}
-    # If a Solidarity Tech API key is provided, use the API to get user data
-    if solidarity_tech_api_key:
-        try:
-            response = requests.get("http://127.0.0.1:5000/solidarity_tech_api/users")
-            response.raise_for_status()  # Raise an exception for bad status codes
-            users = response.json()
-            user_data = {user["phone_number"]: user["name"] for user in users}
-        except requests.exceptions.RequestException as e:
-            return jsonify({"error": f"Could not connect to Solidarity Tech API: {e}"}), 500
-    else:
-        # Otherwise, use the local mock database
-        user_data = local_mock_database
-
-    results = []
-    # Iterate over all users in the database
-    for phone_number, claimed_name in user_data.items():
+    user_data = load_user_data()
+
+    # Numbers already in the cache are answered directly; only misses go to Twilio.
+    # Those are looked up concurrently (at most TWILIO_CONCURRENCY at a time); each
+    # lookup is I/O-bound, so they overlap instead of running one after another.
+    # The cache is read for all numbers at once (a single round trip on Redis),
+    # so the first results can be sent without waiting on one read per number.
+    # If that read fails, every number is reported as a per-number error.
+    cache_errors = {}
+    try:
+        cached_names = get_cached_names(user_data)
+    except Exception as e:
+        cached_names = {}
+        cache_errors = {phone_number: e for phone_number in user_data}
+    futures = {}
+    for phone_number in user_data:
+        if phone_number not in cached_names and phone_number not in cache_errors:
+            futures[lookup_executor.submit(lookup_caller_name, phone_number)] = phone_number
+
+    # Names fetched from Twilio, written to the cache in one batch at the end
+    new_names = []
+    # Lookups whose result has already been sent to the client
+    consumed = set()
+
+    def generate():
+        separator = b""
+        yield b"["
+        for phone_number, caller_name in cached_names.items():
+            result = identity_result(phone_number, user_data[phone_number], caller_name)
+            yield separator + orjson.dumps(result, option=orjson.OPT_SORT_KEYS)
+            separator = b","
+        for phone_number, error in cache_errors.items():
+            result = lookup_error_result(phone_number, user_data[phone_number], error)
+            yield separator + orjson.dumps(result, option=orjson.OPT_SORT_KEYS)
+            separator = b","
+
+        # Send each Twilio result as soon as its lookup finishes
+        for future in as_completed(futures):
+            phone_number = futures[future]
+            claimed_name = user_data[phone_number]
+            consumed.add(future)
+            try:
+                caller_name = future.result()
+            except Exception as e:
+                # Handle exceptions, such as an invalid phone number
+                result = lookup_error_result(phone_number, claimed_name, e)
+            else:
+                if caller_name:
+                    new_names.append((phone_number, caller_name))
+                result = identity_result(phone_number, claimed_name, caller_name)
+            yield separator + orjson.dumps(result, option=orjson.OPT_SORT_KEYS)
+            separator = b","
+        yield b"]"
+
+    def finish():
+        # Runs when the response is closed, including when the client disconnects
+        # before or while reading it. Lookups that haven't started are cancelled so
+        # they don't hold lookup_executor slots; ones already running are cached
+        # when they finish rather than thrown away.
+        for future, phone_number in futures.items():
+            if future not in consumed and not future.cancel():
+                future.add_done_callback(partial(cache_finished_lookup, phone_number))
         try:
-            # Get the caller name using the cache-enhanced lookup
-            caller_name = fetch_caller_name_with_cache(phone_number)
+            cache_names_bulk(new_names)
         except Exception as e:
-            # Handle exceptions, such as an invalid phone number
-            results.append({
-                "phone_number": phone_number,
-                "claimed_name": claimed_name,
-                "twilio_name": None,
-                "status": "Twilio Lookup Error",
-                "error": str(e)
-            })
-            continue
-
-        # Compare the names
-        if caller_name and caller_name == claimed_name:
-            status = "Identity Verified"
-        else:
-            status = "Identity Invalid"
-        
-        results.append({
-            "phone_number": phone_number,
-            "claimed_name": claimed_name,
-            "twilio_name": caller_name or "Name not found or not available",
-            "status": status
-        })
-
-    return jsonify(results)
-
-# This block runs the Flask application.
+            print(f"WARNING: Could not cache lookup results: {e}")
+
+    response = Response(stream_with_context(generate()), mimetype="application/json")
+    response.call_on_close(finish)
+    return response
+
+# This block runs the Flask development server.
+# In production the app is served by gunicorn instead (see the Dockerfile).
 if __name__ == "__main__":
-    # The app is run in debug mode, which provides helpful error messages.
+    # Debug mode provides helpful error messages but is slow; enable it with FLASK_DEBUG=1.
     # The host is set to "0.0.0.0" to make the app accessible from other devices on the same network.
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", host="0.0.0.0", port=5000, threaded=True)